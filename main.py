@@ -1,8 +1,16 @@
+import io
 import json
 import os
-import xml.etree.ElementTree as ET
-import xml.dom.minidom as minidom  # Добавляем для форматирования
-from collections import defaultdict
+from sys import intern
+from xml.parsers import expat
+from xml.sax.saxutils import escape
+from collections import defaultdict, namedtuple
+from concurrent.futures import ThreadPoolExecutor
+
+try:
+    import orjson  # Быстрый сериализатор JSON, если установлен
+except ImportError:
+    orjson = None
 
 # Папка для выходных файлов
 OUTPUT_DIR = "out"
@@ -11,9 +19,53 @@ os.makedirs(OUTPUT_DIR, exist_ok=True)
 # Папка для входных файлов
 INPUT_DIR = "input"
 
+# Пути к входным и выходным файлам собираю один раз
+MODEL_XML_PATH = os.path.join(INPUT_DIR, "impulse_test_input.xml")
+CONFIG_PATH = os.path.join(INPUT_DIR, "config.json")
+PATCHED_CONFIG_PATH = os.path.join(INPUT_DIR, "patched_config.json")
+CONFIG_XML_OUT = os.path.join(OUTPUT_DIR, "config.xml")
+META_JSON_OUT = os.path.join(OUTPUT_DIR, "meta.json")
+DELTA_JSON_OUT = os.path.join(OUTPUT_DIR, "delta.json")
+RES_PATCHED_CONFIG_OUT = os.path.join(OUTPUT_DIR, "res_patched_config.json")
+
+# Кэш значений multiplicity: одинаковые min/max хранятся одним объектом
+_MULT_CACHE = {}
+
+
+def dumps_json(obj):
+    """Сериализует объект в JSON (UTF-8, отступ 2 пробела)."""
+    if orjson is not None:
+        try:
+            return orjson.dumps(obj, option=orjson.OPT_INDENT_2)
+        except orjson.JSONEncodeError:
+            pass  # Например, целые больше 64 бит: их умеет записать только json
+    return json.dumps(obj, indent=2, ensure_ascii=False).encode("utf-8")
+
+
+class _NonFiniteFloat(float):
+    """NaN/Infinity из входного JSON: orjson их отвергает, и dumps_json записывает их через json."""
+    __slots__ = ()
+
+
+def load_json(input_path):
+    """Читает JSON-файл целиком в байты и разбирает его стандартным json."""
+    # orjson.loads молча превращает целые больше 64 бит во float и отвергает NaN/Infinity,
+    # поэтому входные конфиги разбираю через json: diff должен видеть значения точно
+    with open(input_path, "rb") as f:
+        data = f.read()
+    return json.loads(data, parse_constant=_NonFiniteFloat)
+
+
+def write_file(output_path, data):
+    """Записывает готовые байты в файл с буфером 1 МиБ."""
+    with open(output_path, "wb", buffering=1 << 20) as f:
+        f.write(data)
+
 
 class ClassInfo:
     """Класс для хранения информации о классе из XML."""
+    __slots__ = ("name", "is_root", "documentation", "attributes", "children", "min", "max")
+
     def __init__(self, name, is_root, documentation):
         self.name = name
         self.is_root = is_root
@@ -24,11 +76,9 @@ class ClassInfo:
         self.max = "0"
 
 
-class Attribute:
+class Attribute(namedtuple("Attribute", ("name", "type"))):
     """Класс для хранения информации об атрибуте класса."""
-    def __init__(self, name, attr_type):
-        self.name = name
-        self.type = attr_type
+    __slots__ = ()
 
 
 class ModelParser:
@@ -36,39 +86,53 @@ class ModelParser:
     def __init__(self, xml_path):
         self.classes = {}
         self.aggregations = []
+        self.root_class = None
         self.parse_xml(xml_path)
 
     def parse_xml(self, xml_path):
-        tree = ET.parse(xml_path)  # Читаю XML-файл
-        root = tree.getroot()
-
-        # Парсинг классов
-        for class_elem in root.findall(".//Class"):
-            name = class_elem.get("name")
-            is_root = class_elem.get("isRoot") == "true"
-            documentation = class_elem.get("documentation", "")
-            class_info = ClassInfo(name, is_root, documentation)
-
-            # Парсинг атрибутов
-            for attr_elem in class_elem.findall("Attribute"):
-                attr_name = attr_elem.get("name")
-                attr_type = attr_elem.get("type")
-                class_info.attributes.append(Attribute(attr_name, attr_type))
-
-            self.classes[name] = class_info
-
-        # Парсинг агрегаций
-        for agg_elem in root.findall(".//Aggregation"):
-            source = agg_elem.get("source")
-            target = agg_elem.get("target")
-            source_multiplicity = agg_elem.get("sourceMultiplicity")
-            target_multiplicity = agg_elem.get("targetMultiplicity")
-            self.aggregations.append({
-                "source": source,
-                "target": target,
-                "sourceMultiplicity": source_multiplicity,
-                "targetMultiplicity": target_multiplicity
-            })
+        # Разбираю XML через Expat: обработчики пишут сразу в self.classes и self.aggregations,
+        # дерево элементов в памяти не строится.
+
+        # Стек открытых элементов: ClassInfo для <Class>, None для остальных тегов.
+        # Attribute относится к классу, только если <Class> — его непосредственный родитель
+        open_elements = []
+
+        def on_start(tag, a):
+            if tag == "Class":
+                name = intern(a["name"])
+                is_root = a.get("isRoot") == "true"
+                documentation = a.get("documentation", "")
+                class_info = ClassInfo(name, is_root, documentation)
+                if is_root and self.root_class is None:
+                    self.root_class = class_info  # Запоминаю первый корневой класс
+                self.classes[name] = class_info
+                open_elements.append(class_info)
+                return
+
+            parent_class = open_elements[-1] if open_elements else None
+            if tag == "Attribute" and parent_class is not None:
+                # Имена и типы атрибутов сильно повторяются, храню их в одном экземпляре
+                attr_name = intern(a["name"])
+                attr_type = intern(a.get("type", ""))  # Тип всегда строка
+                parent_class.attributes.append(Attribute(attr_name, attr_type))
+            elif tag == "Aggregation":
+                self.aggregations.append({
+                    "source": intern(a["source"]),
+                    "target": intern(a["target"]),
+                    "sourceMultiplicity": a.get("sourceMultiplicity"),
+                    "targetMultiplicity": a.get("targetMultiplicity")
+                })
+            open_elements.append(None)
+
+        def on_end(tag):
+            open_elements.pop()
+
+        xml_parser = expat.ParserCreate()
+        xml_parser.StartElementHandler = on_start
+        xml_parser.EndElementHandler = on_end
+        with open(xml_path, "rb") as f:
+            xml_parser.ParseFile(f)
+
         # Установка min/max и связей
         for agg in self.aggregations:
             source_class = self.classes[agg["source"]]
@@ -81,182 +145,202 @@ class ModelParser:
                 min_val, max_val = multiplicity.split("..")
             else:
                 min_val = max_val = multiplicity
-            source_class.min = min_val
-            source_class.max = max_val
+            source_class.min = _MULT_CACHE.setdefault(min_val, min_val)
+            source_class.max = _MULT_CACHE.setdefault(max_val, max_val)
 
     def get_root_class(self):
-        return next(cls for cls in self.classes.values() if cls.is_root)  # Находжу первый корневой класс
+        if self.root_class is None:
+            raise ValueError("В модели нет корневого класса")
+        return self.root_class
 
 
 class ConfigXMLGenerator:
     """Генератор XML-файла на основе иерархии классов."""
     @staticmethod
-    def generate(class_info):
-        root = ET.Element(class_info.name)  # Создаю корневой элемент с именем класса
-
-        # Добавляем атрибуты как вложенные элементы
-        for attr in class_info.attributes:
-            attr_elem = ET.SubElement(root, attr.name)
-            attr_elem.text = str(attr.type)
-
-        # Добавляем дочерние классы
-        for child in class_info.children:
-            child_elem = ConfigXMLGenerator.generate(child)
-            root.append(child_elem)
-
-        return root
+    def generate_text(class_info):
+        """Пишет XML-текст напрямую, без построения дерева ElementTree."""
+        out = io.StringIO()
+        write = out.write
+
+        # Обхожу иерархию через явный стек; closing=True означает закрывающий тег.
+        # on_path хранит классы, открытые на текущем пути, чтобы поймать циклы агрегаций
+        on_path = set()
+        stack = [(0, class_info, False)]
+        while stack:
+            depth, item, closing = stack.pop()
+            indent = "  " * depth
+            name = item.name
+            if closing:
+                on_path.discard(item)
+                write(f"{indent}</{name}>\n")
+                continue
+
+            if item in on_path:
+                raise ValueError(f"Циклическая агрегация через класс {name}")
+            if not item.attributes and not item.children:
+                write(f"{indent}<{name} />\n")
+                continue
+            write(f"{indent}<{name}>\n")
+
+            # Добавляем атрибуты как вложенные элементы
+            attr_indent = indent + "  "
+            for attr in item.attributes:
+                if attr.type:
+                    write(f"{attr_indent}<{attr.name}>{escape(attr.type)}</{attr.name}>\n")
+                else:
+                    write(f"{attr_indent}<{attr.name} />\n")
+
+            # Дочерние классы кладу в обратном порядке, чтобы вывести их в исходном
+            on_path.add(item)
+            stack.append((depth, item, True))
+            for child in reversed(item.children):
+                stack.append((depth + 1, child, False))
+
+        return out.getvalue().rstrip("\n")
 
     @staticmethod
-    def save(root, output_path):
-        # Форматируем XML
-        rough_string = ET.tostring(root, encoding='utf-8')  #
-        reparsed = minidom.parseString(rough_string)
-        pretty_xml = reparsed.toprettyxml(indent="  ")
-
-        # Удаляем лишнюю строку с декларацией xml
-        pretty_xml = '\n'.join(line for line in pretty_xml.splitlines() if not line.startswith('<?xml'))
+    def serialize(text):
+        return text.encode("utf-8")
 
-        with open(output_path, "w", encoding="utf-8") as f:
-            f.write(pretty_xml)
+    @staticmethod
+    def save(text, output_path):
+        write_file(output_path, ConfigXMLGenerator.serialize(text))
 
 
 class MetaJSONGenerator:
     """Генератор meta.json."""
     @staticmethod
     def generate(classes):
-        meta = []
-        for cls in classes.values():
-            entry = {
+        return [
+            {
                 "class": cls.name,
                 "documentation": cls.documentation,
                 "isRoot": cls.is_root,
                 "max": cls.max,
                 "min": cls.min,
-                "parameters": []
+                # Атрибуты, затем дочерние классы
+                "parameters": [{"name": attr.name, "type": attr.type} for attr in cls.attributes]
+                + [{"name": child.name, "type": "class"} for child in cls.children]
             }
+            for cls in classes.values()
+        ]
 
-            for attr in cls.attributes:  # Прохожу по атрибутам
-                entry["parameters"].append({"name": attr.name, "type": attr.type})
-            # Добавляем дочерние классы
-            for child in cls.children:
-                entry["parameters"].append({"name": child.name, "type": "class"})
-            meta.append(entry)
-        return meta
+    @staticmethod
+    def serialize(meta):
+        return dumps_json(meta)
 
     @staticmethod
     def save(meta, output_path):
-        with open(output_path, "w", encoding="utf-8") as f:
-            json.dump(meta, f, indent=4)
+        write_file(output_path, MetaJSONGenerator.serialize(meta))
 
 
 class DeltaJSONGenerator:
     """Генератор delta.json."""
     @staticmethod
     def generate(config, patched_config):
+        """Строит delta за один проход по patched_config."""
         delta = {"additions": [], "deletions": [], "updates": []}
-        config_keys = set(config.keys())
-        patched_keys = set(patched_config.keys())
-
-        # Additions
-        for key in patched_keys - config_keys:  # Ищу новые ключи
-            delta["additions"].append({"key": key, "value": patched_config[key]})
-
-        # Deletions
-        for key in config_keys - patched_keys:
-            delta["deletions"].append(key)
-
-        # Updates
-        for key in config_keys & patched_keys:
-            if config[key] != patched_config[key]:
-                delta["updates"].append({
+        add = delta["additions"].append
+        update = delta["updates"].append
+        missing = object()
+
+        for key, new_value in patched_config.items():
+            old_value = config.get(key, missing)
+            if old_value is missing:  # Новый ключ
+                add({"key": key, "value": new_value})
+            elif old_value != new_value:
+                update({
                     "key": key,
-                    "from": config[key],
-                    "to": patched_config[key]
+                    "from": old_value,
+                    "to": new_value
                 })
+
+        # Deletions
+        delta["deletions"].extend(config.keys() - patched_config.keys())
         return delta
 
+    @staticmethod
+    def serialize(delta):
+        return dumps_json(delta)
+
     @staticmethod
     def save(delta, output_path):
-        with open(output_path, "w", encoding="utf-8") as f:
-            json.dump(delta, f, indent=4)
+        write_file(output_path, DeltaJSONGenerator.serialize(delta))
 
 
 class ResPatchedConfigGenerator:
     """Генератор res_patched_config.json."""
     @staticmethod
-    def generate(config, delta):
-        result = config.copy()
-        # Применяем deletions
-        for key in delta["deletions"]:
-            result.pop(key, None)
-        # Применяем updates
-        for update in delta["updates"]:
-            result[update["key"]] = update["to"]
-        # Применяем additions
-        for addition in delta["additions"]:
-            result[addition["key"]] = addition["value"]
-        return result
+    def generate(patched_config):
+        # После применения delta к config остаются ровно ключи и значения patched_config
+        return dict(patched_config)
+
+    @staticmethod
+    def serialize(result):
+        return dumps_json(result)
 
     @staticmethod
     def save(result, output_path):
-        with open(output_path, "w", encoding="utf-8") as f:
-            json.dump(result, f, indent=4)
+        write_file(output_path, ResPatchedConfigGenerator.serialize(result))
+
+
+def write_config_xml(root_class):
+    """Генерирует и сохраняет config.xml."""
+    config_text = ConfigXMLGenerator.generate_text(root_class)  # Генерирую XML-текст
+    ConfigXMLGenerator.save(config_text, CONFIG_XML_OUT)
+
+
+def write_meta_json(classes):
+    """Генерирует и сохраняет meta.json."""
+    meta = MetaJSONGenerator.generate(classes)  # Генерирую мета-информацию
+    MetaJSONGenerator.save(meta, META_JSON_OUT)
+
+
+def write_delta_and_patched(config, patched_config):
+    """Генерирует и сохраняет delta.json и res_patched_config.json."""
+    delta = DeltaJSONGenerator.generate(config, patched_config)
+    DeltaJSONGenerator.save(delta, DELTA_JSON_OUT)
+    res_patched = ResPatchedConfigGenerator.generate(patched_config)
+    ResPatchedConfigGenerator.save(res_patched, RES_PATCHED_CONFIG_OUT)
 
 
 def main():
     """Основная функция программы."""
     try:
-        required_files = [
-            os.path.join(INPUT_DIR, "impulse_test_input.xml"),
-            os.path.join(INPUT_DIR, "config.json"),
-            os.path.join(INPUT_DIR, "patched_config.json"),
-        ]
-        for file in required_files:
-            if not os.path.exists(file):
-                raise FileNotFoundError(f"Входной файл {file} не найден")
-
-        # Парсинг XML
-        parser = ModelParser(os.path.join(INPUT_DIR, "impulse_test_input.xml"))
-
-        # Генерация config.xml
-        root_class = parser.get_root_class()  # Беру корневой класс
-        config_root = ConfigXMLGenerator.generate(root_class)  # Генерирую XML-структуру
-        ConfigXMLGenerator.save(
-            config_root,
-            os.path.join(OUTPUT_DIR, "config.xml")
-        )
-
-        # Генерация meta.json
-        meta = MetaJSONGenerator.generate(parser.classes)  # Генерирую мета-информацию
-        MetaJSONGenerator.save(
-            meta,
-            os.path.join(OUTPUT_DIR, "meta.json")
-        )
-
-        # Чтение config.json и patched_config.json
-        with open(os.path.join(INPUT_DIR, "config.json"), "r", encoding="utf-8") as f:
-            config = json.load(f)  # Читаю config
-        with open(os.path.join(INPUT_DIR, "patched_config.json"), "r", encoding="utf-8") as f:
-            patched_config = json.load(f)
-
-        # Генерация delta.json
-        delta = DeltaJSONGenerator.generate(config, patched_config)
-        DeltaJSONGenerator.save(
-            delta,
-            os.path.join(OUTPUT_DIR, "delta.json")
-        )
-
-        # Генерация res_patched_config.json
-        res_patched = ResPatchedConfigGenerator.generate(config, delta)
-        ResPatchedConfigGenerator.save(
-            res_patched,
-            os.path.join(OUTPUT_DIR, "res_patched_config.json")
-        )
+        required_files = (MODEL_XML_PATH, CONFIG_PATH, PATCHED_CONFIG_PATH)
+        # Одно чтение каталога вместо stat для каждого файла
+        with os.scandir(INPUT_DIR) as entries:
+            present = {entry.name for entry in entries}
+        missing = [file for file in required_files if os.path.basename(file) not in present]
+        if missing:
+            raise FileNotFoundError(f"Входные файлы не найдены: {', '.join(missing)}")
+
+        # Чтение config.json и patched_config.json идёт в фоне, пока разбирается XML
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            config_future = executor.submit(load_json, CONFIG_PATH)
+            patched_config_future = executor.submit(load_json, PATCHED_CONFIG_PATH)
+
+            # Парсинг XML
+            parser = ModelParser(MODEL_XML_PATH)
+            root_class = parser.get_root_class()  # Беру корневой класс
+
+            config = config_future.result()
+            patched_config = patched_config_future.result()
+
+        # Выходные файлы независимы друг от друга, генерирую и записываю их параллельно
+        with ThreadPoolExecutor(max_workers=3) as executor:
+            futures = [
+                executor.submit(write_config_xml, root_class),
+                executor.submit(write_meta_json, parser.classes),
+                executor.submit(write_delta_and_patched, config, patched_config),
+            ]
+            for future in futures:
+                future.result()  # Пробрасываю исключения из потоков
 
     except FileNotFoundError as e:
         print(f"Ошибка: {e}")
         exit(1)
-    except ET.ParseError as e:
+    except expat.ExpatError as e:
         print(f"Ошибка парсинга XML: {e}")
         exit(1)
     except json.JSONDecodeError as e: